@@ -1,3 +1,6 @@
+import warnings
+
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Union
 
 import pandas as pd
@@ -15,6 +18,25 @@ from .utils import (
 )
 
 
+def _merge_dataframes(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """Outer-align DataFrames from different feeds or urls on their indexes.
+
+    When all indexes have the same number of levels, one concat does the
+    alignment in a single index union. Feeds can mix a plain time index with
+    a (time, z) MultiIndex, which concat cannot union; fall back to the
+    level-aware pairwise join for that case, which aligns on the shared
+    time level.
+    """
+    if len(dfs) == 1:
+        return dfs[0]
+    if len({df.index.nlevels for df in dfs}) == 1:
+        return pd.concat(dfs, axis=1, join="outer").sort_index()
+    df = dfs[0]
+    for i in range(1, len(dfs)):
+        df = df.join(dfs[i], how="outer", sort=True)
+    return df
+
+
 class AXDSSensorSource(base.DataSource):
     """Intake Source for AXDS sensor
 
@@ -56,6 +78,10 @@ class AXDSSensorSource(base.DataSource):
         If ``binned=True``, input the binning interval to return. Options are hourly, daily, weekly, monthly, yearly. If bin_interval is input, binned is set to True. Only used by datatype "sensor_station".
     only_pgids : list, optional
         If input, only return data associated with these parameterGroupIds. This is separate from parameterGroupLabels and parameterGroupIds that might be present in the metadata.
+    chunk_freq : Optional[str], optional
+        If input, split the time range into windows of this pandas frequency (e.g. "MS" for month-start) and expose each window as an intake partition. Each partition is an independent request to the sensor API, so partitions can be read lazily or in parallel and long station histories do not have to fit in memory at once. By default None, in which case there is a single partition covering the full time range.
+    use_cache : bool, optional
+        If True, cache server responses in-process keyed by url so that repeat metadata and data requests for the same station skip the network. By default False.
 
     Raises
     ------
@@ -80,6 +106,8 @@ class AXDSSensorSource(base.DataSource):
         binned: bool = False,
         bin_interval: Optional[str] = None,
         only_pgids: Optional[List[int]] = None,
+        chunk_freq: Optional[str] = None,
+        use_cache: bool = False,
     ):
 
         if internal_id is None and uuid is None:
@@ -94,6 +122,8 @@ class AXDSSensorSource(base.DataSource):
         self.qartod = qartod
         self.use_units = use_units
         self.only_pgids = only_pgids
+        self.chunk_freq = chunk_freq
+        self.use_cache = use_cache
 
         if bin_interval is not None:
             binned = True
@@ -111,17 +141,13 @@ class AXDSSensorSource(base.DataSource):
         if self.internal_id is None or self.uuid is None:
             # uses whichever id is not None
             url = make_search_docs_url(internal_id=self.internal_id, uuid=self.uuid)
-            result = response_from_url(url)[0]
+            result = response_from_url(url, use_cache=self.use_cache)[0]
             assert isinstance(result, dict)  # for mypy
             metadata.update(load_metadata("sensor_station", result))
             self.internal_id = metadata["internal_id"]
             self.uuid = metadata["uuid"]
             self.search_docs_url = url
 
-        # not checking for now
-        # # check station for if we want the output or not — for when source is used directly.
-        # _ = check_station(metadata, verbose=True)
-
         self._dataframe = None
 
         # this is what shows in the source if you print it
@@ -136,6 +162,8 @@ class AXDSSensorSource(base.DataSource):
                 "binned": self.binned,
                 "bin_interval": bin_interval,
                 "only_pgids": self.only_pgids,
+                "chunk_freq": self.chunk_freq,
+                "use_cache": self.use_cache,
             }
         )
 
@@ -154,10 +182,6 @@ class AXDSSensorSource(base.DataSource):
 
         filters = []
 
-        # if "version" not in self.metadata:
-        #     res = response_from_url(make_search_docs_url(self.dataset_id))[0]
-        #     self.metadata["version"] = res["data"]["version"]
-
         if self.metadata["version"] == 1:
 
             # if we should only return the requested variables, use the pgids input for this.
@@ -174,7 +198,7 @@ class AXDSSensorSource(base.DataSource):
             filters.append(make_filter(self.internal_id))
         return filters
 
-    def _load_to_dataframe(self, url: str) -> pd.DataFrame:
+    def _load_to_dataframe(self, url: str) -> Optional[pd.DataFrame]:
         """load from raw data url to DataFrame.
 
         For V1 stations the result of a call to this function will be one of potentially many calls for data, but there will be only one loop below in a call.
@@ -187,41 +211,65 @@ class AXDSSensorSource(base.DataSource):
 
         Returns:
         DataFrame
-            Data.
+            Data, or None if the url contained no data.
         """
-        data_raw = response_from_url(url)
+        data_raw = response_from_url(url, use_cache=self.use_cache)
 
-        # check for presence of any data
+        # check for presence of any data: "data" is missing altogether for
+        # binned requests with no data, and groupedFeeds is empty for raw.
+        # An empty url is not fatal since other urls may still have data.
         assert isinstance(data_raw, dict)
-        # for binned data
-        if "data" not in data_raw:
-            self._dataframe = None
-            raise ValueError(f"No data found for url {url}.")
+        if "data" not in data_raw or len(data_raw["data"]["groupedFeeds"]) == 0:
+            warnings.warn(f"No data found for url {url}.", RuntimeWarning)
+            return None
+
+        # look up variable names by deviceId in O(1) instead of scanning
+        # variables_details for every column
+        device_to_var = {
+            self.metadata["variables_details"][var]["deviceId"]: var
+            for var in self.metadata["variables_details"]
+        }
+
+        # hoist values that do not change between feeds out of the loop
+        # different names for data sets depending on if binned or not
+        if self.binned:
+            metadata_values_name = "avgVals"
+        else:
+            metadata_values_name = "values"
+        only_pgids = self.only_pgids
+        use_units = self.use_units
+        qartod = self.qartod
+
+        # coerce the qartod input once rather than re-checking per feed:
+        # flags are returned whenever qartod is truthy, and data values are
+        # masked by flag only when specific flags were input
+        qartod_enabled = isinstance(qartod, (str, list)) or bool(qartod)
+        if isinstance(qartod, (str, list)):
+            qartod_flags = frozenset([qartod] if isinstance(qartod, str) else qartod)
+        else:
+            qartod_flags = None
 
-        # for raw data
-        if len(data_raw["data"]["groupedFeeds"]) == 0:
-            self._dataframe = None
-            raise ValueError(f"No data found for url {url}.")
+        # These should never be non-None for sensors; check all feeds at once
+        # instead of once per feed iteration
+        if any(
+            feed["metadata"]["lon"] is not None or feed["metadata"]["lat"] is not None
+            for feed in data_raw["data"]["groupedFeeds"]
+        ):
+            raise ValueError("lon/lat should be None for sensors but are not.")
 
         # loop over the data feeds and read the data into DataFrames
         # link to other metadata as needed
         dfs = []
         for feed in data_raw["data"]["groupedFeeds"]:
 
-            # different names for data sets depending on if binned or not
-            if self.binned:
-                metadata_values_name = "avgVals"
-            else:
-                metadata_values_name = "values"
-
             # for the case where we only return data from certain pgids, skip loop if this
             # data is not included
-            if self.only_pgids is not None:
+            if only_pgids is not None:
                 if not any(
                     [
                         var["parameterGroupId"]
                         for var in feed["metadata"][metadata_values_name]
-                        if var["parameterGroupId"] in self.only_pgids
+                        if var["parameterGroupId"] in only_pgids
                     ]
                 ):
                     continue
@@ -232,7 +280,7 @@ class AXDSSensorSource(base.DataSource):
             # indices first: time and potentially z
             feed_ind = feed["metadata"]["time"]
             feed_ind["column_name"] = make_label(
-                feed_ind["label"], feed_ind.get("units", None), use_units=self.use_units
+                feed_ind["label"], feed_ind.get("units", None), use_units=use_units
             )
             indices[feed_ind["index"]] = feed_ind
 
@@ -242,20 +290,10 @@ class AXDSSensorSource(base.DataSource):
                 feed_ind["column_name"] = make_label(
                     feed_ind["label"],
                     feed_ind.get("units", None),
-                    use_units=self.use_units,
+                    use_units=use_units,
                 )
                 indices[feed_ind["index"]] = feed_ind
 
-            # These should never be non-None for sensors
-            if (
-                feed["metadata"]["lon"] is not None
-                or feed["metadata"]["lat"] is not None
-            ):
-                lon, lat = feed["metadata"]["lon"], feed["metadata"]["lat"]
-                raise ValueError(
-                    f"lon/lat should be None for sensors but are {lon}, {lat}."
-                )
-
             # add data columns
             data_cols = {
                 val["index"]: val for val in feed["metadata"][metadata_values_name]
@@ -263,16 +301,11 @@ class AXDSSensorSource(base.DataSource):
             # match variable name from metadata (standard_name) to be column name
             for index in data_cols:
                 # variable name
-                label = [
-                    var
-                    for var in self.metadata["variables_details"]
-                    if self.metadata["variables_details"][var]["deviceId"]
-                    == data_cols[index]["deviceId"]
-                ][0]
+                label = device_to_var[data_cols[index]["deviceId"]]
                 data_cols[index]["label"] = label
                 # column name
                 data_cols[index]["column_name"] = make_label(
-                    label, data_cols[index].get("units", None), use_units=self.use_units
+                    label, data_cols[index].get("units", None), use_units=use_units
                 )
 
             columns.update(data_cols)
@@ -280,66 +313,94 @@ class AXDSSensorSource(base.DataSource):
             # whether or not to read in QARTOD Aggregation flags is chosen at the catalog level in axds_cat.py
             # columns only includes the QA column info if qartod is True
             # or, include QARTOD columns but then remove data rows based on the flag values.
-            qartod = self.qartod
-            if isinstance(qartod, (str, list)) or qartod:
+            if qartod_enabled:
 
                 # add qartod columns
                 qa_cols = {val["index"]: val for val in feed["metadata"]["qcAgg"]}
+                # look up the data column name for each deviceId in O(1)
+                device_to_colname = {
+                    val["deviceId"]: val["column_name"] for val in data_cols.values()
+                }
                 # match variable name using deviceId from metadata (standard_name) to be column name
                 for index in qa_cols:
-                    label = [
-                        var
-                        for var in self.metadata["variables_details"]
-                        if self.metadata["variables_details"][var]["deviceId"]
-                        == qa_cols[index]["deviceId"]
-                    ][0]
+                    label = device_to_var[qa_cols[index]["deviceId"]]
                     qa_cols[index]["label"] = f"{label}_qc_agg"
                     qa_cols[index]["column_name"] = qa_cols[index]["label"]
 
                     # match deviceId between data_col and qa_col to get column name associated with qa_col
-                    name = [
-                        data_cols[ind]["column_name"]
-                        for ind in data_cols
-                        if data_cols[ind]["deviceId"] == qa_cols[index]["deviceId"]
-                    ][0]
-                    qa_cols[index]["data_name"] = name
+                    qa_cols[index]["data_name"] = device_to_colname[
+                        qa_cols[index]["deviceId"]
+                    ]
                     columns.update(qa_cols)
 
-            col_names = [columns[i]["column_name"] for i in list(columns)]
-            ind_names = [indices[i]["column_name"] for i in list(indices)]
+            col_names = [col["column_name"] for col in columns.values()]
+            ind_names = [ind["column_name"] for ind in indices.values()]
 
-            # do this in steps in case we are dropping QA columns
-            df = pd.DataFrame(feed["data"])
-            icolumns_to_keep = list(indices) + list(columns)
-            df = df[icolumns_to_keep]
-            df.columns = ind_names + col_names
-            df.set_index(ind_names, inplace=True)
+            # transpose the list of rows once and keep only the columns we
+            # need, instead of building a dataframe of all columns and then
+            # projecting out a subset
+            feed_columns = list(zip(*feed["data"]))
 
-            # nan data for which QARTOD flags shouldn't be included
-            if isinstance(qartod, (str, list)):
-                if isinstance(qartod, str):
-                    qartod = [qartod]
+            # parse the time values with the fixed-format datetime path once,
+            # instead of leaving them as strings for pandas to compare later
+            itime = feed["metadata"]["time"]["index"]
+            feed_columns[itime] = pd.to_datetime(
+                feed_columns[itime], format="ISO8601", utc=True, cache=True
+            )
+
+            # build the index up front rather than set_index after the fact,
+            # which would copy the index columns out of the dataframe
+            ind_positions = list(indices)
+            if len(ind_positions) == 1:
+                index = pd.DatetimeIndex(
+                    feed_columns[ind_positions[0]], name=ind_names[0]
+                )
+            else:
+                index = pd.MultiIndex.from_arrays(
+                    [feed_columns[i] for i in ind_positions], names=ind_names
+                )
+            df = pd.DataFrame(
+                {name: feed_columns[i] for name, i in zip(col_names, columns)},
+                index=index,
+            )
+
+            # a monotonic index lets the cross-feed alignment below run as a
+            # linear merge instead of re-sorting per join
+            if not df.index.is_monotonic_increasing:
+                df.sort_index(inplace=True)
 
+            # QARTOD flags are small ints (1, 2, 3, 4, 9); keep them as
+            # nullable Int8 so comparisons run on integer codes and any
+            # returned flag columns take 1 byte per value instead of 8
+            if qartod_enabled:
+                for ind in qa_cols:
+                    qa_name = qa_cols[ind]["column_name"]
+                    df[qa_name] = df[qa_name].astype("Int8")
+
+            # nan data for which QARTOD flags shouldn't be included
+            if qartod_flags is not None:
                 for ind in qa_cols:
                     data_name = qa_cols[ind]["data_name"]  # data column name
                     qa_name = qa_cols[ind]["column_name"]  # qa column name
 
-                    for qa in qartod:
-                        df.loc[df[qa_name] != qa, data_name] = pd.NA
+                    # nan data values in one vectorized pass: any row whose
+                    # aggregate flag is not one of the requested flags
+                    df.loc[~df[qa_name].isin(qartod_flags), data_name] = pd.NA
 
-                # drop qartod columns
-                df.drop(labels=qa_name, axis=1, inplace=True)
+                # drop all qartod columns at once
+                df.drop(
+                    labels=[qa_cols[ind]["column_name"] for ind in qa_cols],
+                    axis=1,
+                    inplace=True,
+                )
 
             dfs.append(df)
 
-        df = dfs[0]
-
-        # this gets different and I think better results than dfs[0].join(dfs[1:], how="outer", sort=True)
-        # even though they should probably return the same thing.
-        for i in range(1, len(dfs)):
-            df = df.join(dfs[i], how="outer", sort=True)
+        # possible if all feeds were skipped for not being in only_pgids
+        if len(dfs) == 0:
+            return None
 
-        return df
+        return _merge_dataframes(dfs)
 
     @property
     def data_urls(self):
@@ -350,9 +411,14 @@ class AXDSSensorSource(base.DataSource):
 
         if not hasattr(self, "_data_urls"):
 
-            # get extended metadata which we need both for reading the data and as metadata
-            result = response_from_url(make_search_docs_url(uuid=self.uuid))[0]
-            self.metadata.update(load_metadata("sensor_station", result))
+            # get extended metadata which we need both for reading the data
+            # and as metadata, unless it was already fetched in __init__ or
+            # passed in from the catalog
+            if "version" not in self.metadata:
+                result = response_from_url(
+                    make_search_docs_url(uuid=self.uuid), use_cache=self.use_cache
+                )[0]
+                self.metadata.update(load_metadata("sensor_station", result))
 
             start_time = self.start_time or self.metadata["minTime"]
             end_time = self.end_time or self.metadata["maxTime"]
@@ -369,38 +435,153 @@ class AXDSSensorSource(base.DataSource):
     def _load(self):
         """How to load in a specific station once you know it by uuid"""
 
-        dfs = [self._load_to_dataframe(url) for url in self.data_urls]
+        urls = self.data_urls
+
+        # the requests are independent of each other and network-bound, so
+        # fetch them concurrently. One url at a time is the V2 case.
+        if len(urls) == 1:
+            dfs = [self._load_to_dataframe(urls[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(8, len(urls))) as executor:
+                dfs = list(executor.map(self._load_to_dataframe, urls))
+
+        # drop urls that had no data; error only if there is none at all
+        dfs = [df for df in dfs if df is not None]
+        if len(dfs) == 0:
+            raise ValueError(f"No data found for station {self.uuid}.")
+
+        self._dataframe = _merge_dataframes(dfs)
+
+    def _load_window(self, start_time, end_time) -> Optional[pd.DataFrame]:
+        """Load data for one time window across all filters.
 
-        df = dfs[0]
-        # this gets different and I think better results than dfs[0].join(dfs[1:], how="outer", sort=True)
-        # even though they should probably return the same thing.
-        for i in range(1, len(dfs)):
-            df = df.join(dfs[i], how="outer", sort=True)
+        Returns None if the window contains no data, so that callers can
+        tell an empty window apart from a real error.
+        """
+        urls = [
+            make_data_url(
+                filter, str(start_time), str(end_time), self.binned, self.bin_interval
+            )
+            for filter in self.get_filters()
+        ]
+        dfs = [self._load_to_dataframe(url) for url in urls]
+        dfs = [df for df in dfs if df is not None]
+        if len(dfs) == 0:
+            return None
+        return _merge_dataframes(dfs)
+
+    def _load_small_window(self) -> Optional[pd.DataFrame]:
+        """Load a short window of data from which to infer the schema.
+
+        Returns None if the window happens to contain no data.
+        """
+        _ = self.data_urls  # makes sure metadata has been fetched
 
-        self._dataframe = df
+        start_time = pd.Timestamp(self.start_time or self.metadata["minTime"])
+        end_time = start_time + pd.Timedelta("1 hour")
+        return self._load_window(start_time, end_time)
+
+    @property
+    def partition_ranges(self):
+        """Time window (start, end) per partition.
+
+        One window covering the full time range unless ``chunk_freq`` was
+        input, in which case the time range is split at that frequency.
+        """
+        if not hasattr(self, "_partition_ranges"):
+            _ = self.data_urls  # makes sure metadata has been fetched
+
+            # normalize both bounds to UTC: user-input times may be naive
+            # while the metadata times are tz-aware, and date_range refuses
+            # to mix the two
+            start_time = pd.to_datetime(
+                self.start_time or self.metadata["minTime"], utc=True
+            )
+            end_time = pd.to_datetime(
+                self.end_time or self.metadata["maxTime"], utc=True
+            )
+            if self.chunk_freq is None:
+                self._partition_ranges = [(start_time, end_time)]
+            else:
+                # boundaries at chunk_freq, always including both endpoints
+                bounds = pd.date_range(start_time, end_time, freq=self.chunk_freq)
+                bounds = (
+                    [start_time]
+                    + [b for b in bounds if start_time < b < end_time]
+                    + [end_time]
+                )
+                # windows stay closed on both ends: the urls render whole
+                # seconds, so shrinking a window would leave sub-second
+                # samples at a boundary covered by no partition. The
+                # resulting boundary duplicates are dropped in read().
+                self._partition_ranges = list(zip(bounds[:-1], bounds[1:]))
+        return self._partition_ranges
 
     def _get_schema(self):
-        """get schema"""
-        if self._dataframe is None:
-            # TODO: could do partial read with chunksize to get likely schema from
-            # first few records, rather than loading the whole thing
+        """get schema
+
+        If the full dataframe has not been read in yet, infer the schema
+        from a short window of data at the start of the time range instead
+        of loading everything just to report dtypes; the number of rows is
+        then unknown until ``read()``. For V1 stations the reported columns
+        can be a subset of the full set if only some parameter groups have
+        data in that window.
+        """
+        if self._dataframe is not None:
+            return base.Schema(
+                datashape=None,
+                dtype=self._dataframe.dtypes,
+                shape=self._dataframe.shape,
+                npartitions=len(self.partition_ranges),
+                extra_metadata={},
+            )
+
+        df = self._load_small_window()
+        if df is None:
+            # no data near the start of the time range; fall back to the
+            # full read
             self._load()
+            df = self._dataframe
+            shape = df.shape
+        else:
+            shape = (None, df.shape[1])
         return base.Schema(
             datashape=None,
-            dtype=self._dataframe.dtypes,
-            shape=self._dataframe.shape,
-            npartitions=1,
+            dtype=df.dtypes,
+            shape=shape,
+            npartitions=len(self.partition_ranges),
             extra_metadata={},
         )
 
-    def _get_partition(self, _):
-        """get partition"""
+    def _get_partition(self, i):
+        """get partition
+
+        With ``chunk_freq`` input, partition ``i`` is one time window and is
+        fetched independently; an empty window returns an empty DataFrame.
+        Otherwise there is a single partition holding the full time range.
+        """
+        if self.chunk_freq is not None:
+            df = self._load_window(*self.partition_ranges[i])
+            return pd.DataFrame() if df is None else df
         if self._dataframe is None:
-            self._load_metadata()
+            self._load()
         return self._dataframe
 
     def read(self):
         """read data in"""
+        if self.chunk_freq is not None:
+            if self._dataframe is None:
+                dfs = [
+                    self._get_partition(i) for i in range(len(self.partition_ranges))
+                ]
+                dfs = [df for df in dfs if not df.empty]
+                if len(dfs) == 0:
+                    raise ValueError(f"No data found for station {self.uuid}.")
+                df = pd.concat(dfs, axis=0)
+                # neighboring windows share a closed boundary, so a sample
+                # falling exactly on it comes back from both partitions
+                self._dataframe = df[~df.index.duplicated(keep="first")]
+            return self._dataframe
         return self._get_partition(None)
 
     def _close(self):
@@ -3,7 +3,11 @@ Set up a catalog for Axiom assets.
 """
 
 
+import threading
+import time
+
 from datetime import datetime
+from functools import partial
 from typing import List, MutableMapping, Optional, Sequence, Tuple, Union
 
 import pandas as pd
@@ -18,13 +22,22 @@ from . import __version__
 from .axds import AXDSSensorSource
 from .utils import (
     check_station,
+    fetch_many,
     load_metadata,
     match_key_to_parameter,
     match_std_names_to_parameter,
-    response_from_url,
 )
 
 
+# entry kwargs shared by every dataset; per-entry dicts like metadata and
+# args are still created fresh per entry
+_make_entry = partial(LocalCatalogEntry, direct_access="allow")
+
+# groups of kwargs_search keys that must be input together
+_BBOX_KEYS = frozenset({"min_lon", "max_lon", "min_lat", "max_lat"})
+_TIME_KEYS = frozenset({"min_time", "max_time"})
+
+
 class AXDSCatalog(Catalog):
     """
     Makes data sources out of all datasets for a given AXDS data type.
@@ -117,6 +130,12 @@ class AXDSCatalog(Catalog):
     name = "axds_cat"
     version = __version__
 
+    # process-wide cache of combined search results keyed by the search urls
+    # and query_type, so re-instantiating an identical catalog within ttl
+    # skips the network. Only used when ttl is input.
+    _results_cache: dict = {}
+    _results_cache_lock = threading.Lock()
+
     def __init__(
         self,
         datatype: str,
@@ -237,17 +256,15 @@ class AXDSCatalog(Catalog):
             if isinstance(self.kwargs_search["search_for"], str):
                 self.kwargs_search["search_for"] = [self.kwargs_search["search_for"]]
 
-        checks = [
-            ["min_lon", "max_lon", "min_lat", "max_lat"],
-            ["min_time", "max_time"],
-        ]
-        for check in checks:
-            if any(key in self.kwargs_search for key in check) and not all(
-                key in self.kwargs_search for key in check
-            ):
-                raise ValueError(
-                    f"If any of {check} are input, they all must be input."
-                )
+        keys = self.kwargs_search.keys()
+        if keys & _BBOX_KEYS and not _BBOX_KEYS <= keys:
+            raise ValueError(
+                f"If any of {sorted(_BBOX_KEYS)} are input, they all must be input."
+            )
+        if keys & _TIME_KEYS and not _TIME_KEYS <= keys:
+            raise ValueError(
+                f"If any of {sorted(_TIME_KEYS)} are input, they all must be input."
+            )
 
         if "min_lon" in self.kwargs_search and "max_lon" in self.kwargs_search:
             min_lon, max_lon = (
@@ -260,6 +277,37 @@ class AXDSCatalog(Catalog):
                         "`min_lon` and `max_lon` must be in the range -180 to 180."
                     )
 
+        # precompute the constant url fragments once; search_url may be
+        # called once per pglabel/search_for combination
+        self._geom_fragment = ""
+        if self.kwargs_search.keys() >= _BBOX_KEYS:
+            min_lon, max_lon = (
+                self.kwargs_search["min_lon"],
+                self.kwargs_search["max_lon"],
+            )
+            min_lat, max_lat = (
+                self.kwargs_search["min_lat"],
+                self.kwargs_search["max_lat"],
+            )
+            self._geom_fragment = (
+                '&geom={"type":"Polygon","coordinates":'
+                f"[[[{min_lon},{min_lat}],[{max_lon},{min_lat}],[{max_lon},{max_lat}],"
+                f"[{min_lon},{max_lat}],[{min_lon},{min_lat}]]]}}"
+            )
+
+        # convert input datetimes to seconds since 1970
+        self._time_fragment = ""
+        if self.kwargs_search.keys() >= {"max_time", "min_time"}:
+            start_epoch = int(
+                pd.Timestamp(self.kwargs_search["min_time"], tz="UTC").timestamp()
+            )
+            end_epoch = int(
+                pd.Timestamp(self.kwargs_search["max_time"], tz="UTC").timestamp()
+            )
+            self._time_fragment = (
+                f"&startDateTime={start_epoch}&endDateTime={end_epoch}"
+            )
+
         # input keys_to_match OR standard_names but not both
         if keys_to_match is not None and standard_names is not None:
             raise ValueError(
@@ -312,39 +360,9 @@ class AXDSCatalog(Catalog):
 
         self.url_search_base = f"https://search.axds.co/v2/search?portalId=-1&page=1&pageSize={self.page_size}&verbose=true"
 
-        url = f"{self.url_search_base}&type={self.datatype}"
-
-        assert isinstance(self.kwargs_search, dict)
-        if self.kwargs_search.keys() >= {
-            "max_lon",
-            "min_lon",
-            "min_lat",
-            "max_lat",
-        }:
-            url_add_box = (
-                f'&geom={{"type":"Polygon","coordinates":[[[{self.kwargs_search["min_lon"]},{self.kwargs_search["min_lat"]}],'
-                + f'[{self.kwargs_search["max_lon"]},{self.kwargs_search["min_lat"]}],'
-                + f'[{self.kwargs_search["max_lon"]},{self.kwargs_search["max_lat"]}],'
-                + f'[{self.kwargs_search["min_lon"]},{self.kwargs_search["max_lat"]}],'
-                + f'[{self.kwargs_search["min_lon"]},{self.kwargs_search["min_lat"]}]]]}}'
-            )
-            url += f"{url_add_box}"
-
-        if self.kwargs_search.keys() >= {"max_time", "min_time"}:
-            # convert input datetime to seconds since 1970
-            startDateTime = (
-                pd.Timestamp(self.kwargs_search["min_time"]).tz_localize("UTC")
-                - pd.Timestamp("1970-01-01 00:00").tz_localize("UTC")
-            ) // pd.Timedelta("1s")
-            endDateTime = (
-                pd.Timestamp(self.kwargs_search["max_time"]).tz_localize("UTC")
-                - pd.Timestamp("1970-01-01 00:00").tz_localize("UTC")
-            ) // pd.Timedelta("1s")
-
-            # search by time
-            url_add_time = f"&startDateTime={startDateTime}&endDateTime={endDateTime}"
-
-            url += f"{url_add_time}"
+        # bbox and time fragments are precomputed in __init__ (empty strings
+        # when those searches are not requested)
+        url = f"{self.url_search_base}&type={self.datatype}{self._geom_fragment}{self._time_fragment}"
 
         if text_search is not None:
             url += f"&query={text_search}"
@@ -394,10 +412,23 @@ class AXDSCatalog(Catalog):
             if no results found.
         """
 
+        search_urls = self.get_search_urls()
+
+        # reuse recent identical searches across catalog instances when a ttl
+        # was requested; the urls capture all of the search parameters
+        cache_key = (self.query_type, tuple(search_urls))
+        if self.ttl is not None:
+            with self._results_cache_lock:
+                cached = self._results_cache.get(cache_key)
+            if cached is not None and time.time() - cached[0] < self.ttl:
+                return cached[1]
+
+        responses = fetch_many(search_urls)
+
         combined_results = []
+        seen_uuids = set()
         first_loop = True
-        for search_url in self.get_search_urls():
-            res = response_from_url(search_url)
+        for search_url, res in zip(search_urls, responses):
             if "results" not in res:
                 raise ValueError(
                     f"No results were returned for the search. Search url: {search_url}."
@@ -411,7 +442,12 @@ class AXDSCatalog(Catalog):
                 )
 
             if self.query_type == "union":  # logical OR
-                combined_results.extend(res["results"])
+                # keep only the first occurrence of each uuid so the main
+                # catalog loop never sees duplicates
+                for dataset in res["results"]:
+                    if dataset["uuid"] not in seen_uuids:
+                        seen_uuids.add(dataset["uuid"])
+                        combined_results.append(dataset)
 
             elif (
                 self.query_type == "intersection"
@@ -436,9 +472,13 @@ class AXDSCatalog(Catalog):
         if self.verbose:
             unique = set([res["uuid"] for res in combined_results])
             print(
-                f"Total number of results found for page_size {self.page_size} over {len(self.get_search_urls())} different searches with query_type {self.query_type}: {len(combined_results)}, with unique results: {len(unique)}."
+                f"Total number of results found for page_size {self.page_size} over {len(search_urls)} different searches with query_type {self.query_type}: {len(combined_results)}, with unique results: {len(unique)}."
             )
 
+        if self.ttl is not None:
+            with self._results_cache_lock:
+                self._results_cache[cache_key] = (time.time(), combined_results)
+
         return combined_results
 
     def _load(self):
@@ -446,15 +486,31 @@ class AXDSCatalog(Catalog):
 
         results = self._load_all_results()
 
+        # bind attributes used repeatedly in the loop as locals
+        datatype = self.datatype
+        verbose = self.verbose
+        start_time = self.kwargs_search.get("min_time", None)
+        end_time = self.kwargs_search.get("max_time", None)
+        only_pgids = (
+            list(self.pgids) if self.query_type == "intersection_constrained" else None
+        )
+
         self._entries = {}
+        # results is uuid-unique: _load_all_results deduplicates while
+        # combining searches, so no repeat-entry guard is needed here
         for result in results:
             uuid = result["uuid"]
 
-            # don't repeat an entry (it won't actually allow you to, but probably saves time not to try)
-            if uuid in self._entries:
+            # duplicate IOOS mirror stations are detectable from the uuid
+            # alone, so skip them before doing any metadata work
+            if "ism-" in uuid:
+                if verbose:
+                    print(
+                        f"UUID {uuid} is a duplicate station from IOOS and should be skipped."
+                    )
                 continue
 
-            if self.verbose:
+            if verbose:
                 print(f"Dataset ID: {uuid}")
 
             # # quick check if OPENDAP is in the access methods for this uuid, otherwise move on
@@ -477,27 +533,24 @@ class AXDSCatalog(Catalog):
             #             )
             #         continue
 
-            description = f"AXDS dataset_id {uuid} of datatype {self.datatype}"
+            description = f"AXDS dataset_id {uuid} of datatype {datatype}"
 
-            metadata = load_metadata(self.datatype, result)
+            metadata = load_metadata(datatype, result)
 
-            keep_station = check_station(metadata, verbose=self.verbose)
+            keep_station = check_station(metadata, verbose=verbose)
             if not keep_station:
                 continue
 
             # Find urlpath
-            if self.datatype == "platform2":
+            if datatype == "platform2":
                 # use parquet if available, otherwise csv
-                try:
-                    key = [
-                        key
-                        for key in result["source"]["files"].keys()
-                        if ".parquet" in key
-                    ][0]
-                    urlpath = result["source"]["files"][key]["url"]
+                files = result["source"]["files"]
+                parquet_key = next((key for key in files if ".parquet" in key), None)
+                if parquet_key is not None:
+                    urlpath = files[parquet_key]["url"]
                     plugin = ParquetSource
-                except Exception:
-                    urlpath = result["source"]["files"]["data.csv.gz"]["url"]
+                else:
+                    urlpath = files["data.csv.gz"]["url"]
                     plugin = CSVSource
 
                 args = {
@@ -505,20 +558,18 @@ class AXDSCatalog(Catalog):
                 }
 
             # this Source has different arg requirements
-            elif self.datatype == "sensor_station":
+            elif datatype == "sensor_station":
                 args = {
                     "internal_id": metadata["internal_id"],
                     "uuid": uuid,
-                    "start_time": self.kwargs_search.get("min_time", None),
-                    "end_time": self.kwargs_search.get("max_time", None),
+                    "start_time": start_time,
+                    "end_time": end_time,
                     # "kwargs_search": self.kwargs_search,
                     "qartod": self.qartod,
                     "use_units": self.use_units,
                     "binned": self.binned,
                     "bin_interval": self.bin_interval,
-                    "only_pgids": list(self.pgids)
-                    if self.query_type == "intersection_constrained"
-                    else None,
+                    "only_pgids": only_pgids,
                 }
                 plugin = AXDSSensorSource
 
@@ -562,21 +613,12 @@ class AXDSCatalog(Catalog):
             #     else:
             #         urlpath = urlpaths[0]
 
-            entry = LocalCatalogEntry(
+            entry = _make_entry(
                 name=uuid,
                 description=description,
                 driver=plugin,
-                direct_access="allow",
                 args=args,
                 metadata=metadata,
-                # True,
-                # args,
-                # {},
-                # {},
-                # {},
-                # "",
-                # getenv=False,
-                # getshell=False,
             )
 
             entry._plugin = [plugin]
@@ -584,7 +626,7 @@ class AXDSCatalog(Catalog):
             self._entries[uuid] = entry
 
         # final tally
-        if self.verbose:
+        if verbose:
             print(
                 f"Final number of stations found after removing some: {len(self._entries)}."
             )
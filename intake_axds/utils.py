@@ -1,25 +1,92 @@
 """Utils to run."""
 
+import json
+import os
+import warnings
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from importlib.metadata import PackageNotFoundError, version
+from itertools import chain
 from typing import Optional, Union
+from urllib.parse import quote
 
-import cf_pandas as cfp
 import pandas as pd
 import requests
 
 from nested_lookup import nested_lookup
-from shapely import wkt
+from requests.adapters import HTTPAdapter, Retry
+
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
 
 
 search_headers = {"Accept": "application/json"}
 baseurl = "https://sensors.axds.co/api"
 contexturl = "http://oikos.axds.co/rest/context"
 
+# metadata name to result key, mostly matching names in intake-erddap
+_RESULTS_KEY_REMAP = (("uuid", "uuid"), ("title", "label"), ("summary", "description"))
+
+
+def _make_session() -> requests.Session:
+    """Session to use for all requests to AXDS servers.
+
+    Sharing one session means the underlying connections are pooled and
+    reused, so repeated requests to the same server skip the TCP/TLS
+    handshake. Retries with backoff are also handled here.
+
+    Set the environment variable ``INTAKE_AXDS_CACHE`` to an expiry time in
+    seconds to additionally cache responses on disk (requires the optional
+    ``requests-cache`` dependency), which makes repeat catalog builds and
+    station opens across processes skip the network within the expiry.
+    """
+    expire_after = os.environ.get("INTAKE_AXDS_CACHE")
+    session: requests.Session
+    if expire_after is not None:
+        # this runs at import time, so a missing optional dependency must
+        # not make the package unimportable
+        try:
+            import requests_cache
+        except ImportError:  # pragma: no cover
+            warnings.warn(
+                "INTAKE_AXDS_CACHE is set but the optional dependency "
+                "requests-cache is not installed; responses will not be "
+                "cached on disk. Install requests-cache or unset "
+                "INTAKE_AXDS_CACHE.",
+                RuntimeWarning,
+            )
+            session = requests.Session()
+        else:
+            session = requests_cache.CachedSession(
+                cache_name=os.path.expanduser("~/.cache/intake_axds"),
+                backend="sqlite",
+                expire_after=int(expire_after),
+            )
+    else:
+        session = requests.Session()
+    session.headers.update(search_headers)
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=3, backoff_factor=0.2),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+session = _make_session()
+
 
+@lru_cache(maxsize=1)
 def _get_version() -> str:
     """Fixes circular import issues."""
     try:
-        __version__ = version("ocean-model-skill-assessor")
+        __version__ = version("intake-axds")
     except PackageNotFoundError:
         # package is not installed
         __version__ = "unknown"
@@ -27,6 +94,27 @@ def _get_version() -> str:
     return __version__
 
 
+@lru_cache(maxsize=1)
+def _context() -> dict:
+    """Fetch and cache the oikos parameter context.
+
+    The context changes rarely and is needed by ``available_names`` and both
+    parameter matchers, so fetch it once per process.
+    """
+    resp = response_from_url(contexturl)
+    assert isinstance(resp, dict)  # for mypy
+    return resp
+
+
+@lru_cache(maxsize=1)
+def _context_names() -> list:
+    """parameterNames from the cached context, derived once per process.
+
+    These are a superset of standard_names.
+    """
+    return [i["parameterName"] for i in _context()["parameters"]]
+
+
 def available_names() -> list:
     """Return available parameterNames for variables.
 
@@ -36,14 +124,34 @@ def available_names() -> list:
         parametersNames, which are a superset of standard_names.
     """
 
-    resp = response_from_url(contexturl)
-    assert isinstance(resp, dict)  # for mypy
-    params = resp["parameters"]
+    return list(_context_names())
+
 
-    # find parameterName options for AXDS. These are a superset of standard_names
-    names = [i["parameterName"] for i in params]
+def _pglabels_and_pgids(resp: dict, selected_names: list) -> list:
+    """Parameter Group (label, id) pairs for the selected parameterNames.
 
-    return names
+    Builds lookup dicts once instead of re-scanning the parameters and
+    parameterGroups lists for every selected name.
+
+    Returns
+    -------
+    list
+        Unique but ordered pglabels and pgids, as [(labels), (ids)].
+    """
+    name_to_pgids: dict = {}
+    for i in resp["parameters"]:
+        name_to_pgids.setdefault(i["parameterName"], []).append(i["idParameterGroup"])
+    id_to_label = {i["id"]: i["label"] for i in resp["parameterGroups"]}
+
+    pairs = {
+        (id_to_label[pgid], pgid)
+        for name in selected_names
+        for pgid in name_to_pgids.get(name, ())
+        if pgid in id_to_label
+    }
+
+    # want unique but ordered returned
+    return list(zip(*sorted(pairs)))
 
 
 def match_key_to_parameter(
@@ -67,30 +175,13 @@ def match_key_to_parameter(
         Parameter Group values that match key, according to the custom criteria.
     """
 
-    resp = response_from_url(contexturl)
-    assert isinstance(resp, dict)  # for mypy
-    params = resp["parameters"]
-
-    # find parameterName options for AXDS. These are a superset of standard_names
-    names = [i["parameterName"] for i in params]
-    group_params = resp["parameterGroups"]
+    # deferred import: cf-pandas is only needed for criteria matching
+    import cf_pandas as cfp
 
     # select parameterName that matches selected key
-    vars = cfp.match_criteria_key(names, keys_to_match, criteria)
-
-    # find parametergroupid that matches var
-    pgids = [
-        i["idParameterGroup"]
-        for var in vars
-        for i in params
-        if i["parameterName"] == var
-    ]
+    vars = cfp.match_criteria_key(_context_names(), keys_to_match, criteria)
 
-    # find parametergroup label to match id
-    pglabels = [i["label"] for pgid in pgids for i in group_params if i["id"] == pgid]
-
-    # want unique but ordered returned
-    return list(zip(*sorted(set(zip(pglabels, pgids)))))
+    return _pglabels_and_pgids(_context(), vars)
 
 
 def match_std_names_to_parameter(standard_names: list) -> list:
@@ -107,33 +198,35 @@ def match_std_names_to_parameter(standard_names: list) -> list:
         Parameter Group values that match standard_names.
     """
 
-    resp = response_from_url(contexturl)
-    assert isinstance(resp, dict)  # for mypy
-    params = resp["parameters"]
-
-    names = [i["parameterName"] for i in params]
+    names = set(_context_names())
 
-    if not all([std_name in names for std_name in standard_names]):
+    if not all(std_name in names for std_name in standard_names):
         raise ValueError(
             """Input standard_names are not all matches with system parameterNames.
                           Check available values with `intake_axds.available_names()`."""
         )
 
-    group_params = resp["parameterGroups"]
+    return _pglabels_and_pgids(_context(), standard_names)
 
-    # find parametergroupid that matches std_name
-    pgids = [
-        i["idParameterGroup"]
-        for std_name in standard_names
-        for i in params
-        if i["parameterName"] == std_name
-    ]
 
-    # find parametergroup label to match id
-    pglabels = [i["label"] for pgid in pgids for i in group_params if i["id"] == pgid]
+@lru_cache(maxsize=1024)
+def _wkt_bounds(geospatial_bounds: str) -> tuple:
+    """Bounds (minx, miny, maxx, maxy) for a WKT string.
 
-    # want unique but ordered returned
-    return list(zip(*sorted(set(zip(pglabels, pgids)))))
+    Cached since the same bounds strings recur across catalog rebuilds.
+    """
+    # point stations are common; grab the two floats without a GEOS parse
+    if geospatial_bounds.startswith("POINT"):
+        coords = geospatial_bounds[
+            geospatial_bounds.index("(") + 1 : geospatial_bounds.rindex(")")
+        ].split()
+        lon, lat = float(coords[0]), float(coords[1])
+        return (lon, lat, lon, lat)
+
+    # deferred import: loading GEOS is slow and only platform2 needs it
+    from shapely import wkt
+
+    return wkt.loads(geospatial_bounds).bounds
 
 
 def load_metadata(datatype: str, results: dict) -> dict:  #: Dict[str, str]
@@ -152,9 +245,7 @@ def load_metadata(datatype: str, results: dict) -> dict:  #: Dict[str, str]
 
     # mostly matching names in intake-erddap
     metadata = {}
-    keys = ["uuid", "label", "description"]
-    new_names = ["uuid", "title", "summary"]
-    for new_name, key in zip(new_names, keys):
+    for new_name, key in _RESULTS_KEY_REMAP:
         found = [value for value in nested_lookup(key, results) if value is not None]
         if len(found) > 0:
             metadata[new_name] = found[0]  # take first instance
@@ -181,40 +272,82 @@ def load_metadata(datatype: str, results: dict) -> dict:  #: Dict[str, str]
 
     if datatype == "platform2":
         metadata["institution"] = nested_lookup("institution", results)
-        metadata["geospatial_bounds"] = nested_lookup("geospatial_bounds", results)[0]
 
-        p1 = wkt.loads(metadata["geospatial_bounds"])
-        keys = ["minLongitude", "minLatitude", "maxLongitude", "maxLatitude"]
-        metadata.update(dict(zip(keys, p1.bounds)))
+        # some datasets are missing geospatial_bounds; skip the lon/lat
+        # fields rather than erroring
+        found = [
+            value
+            for value in nested_lookup("geospatial_bounds", results)
+            if value is not None
+        ]
+        if len(found) > 0:
+            metadata["geospatial_bounds"] = found[0]
+
+            minx, miny, maxx, maxy = _wkt_bounds(metadata["geospatial_bounds"])
+            metadata.update(
+                {
+                    "minLongitude": minx,
+                    "minLatitude": miny,
+                    "maxLongitude": maxx,
+                    "maxLatitude": maxy,
+                }
+            )
 
         metadata["variables_details"] = nested_lookup("variables", results)
         metadata["variables"] = nested_lookup("standard_name", results)
 
     elif datatype == "sensor_station":
 
+        # sensor_station docs keep these fields under "data"; index it once
+        # instead of walking the whole tree per field with nested_lookup
+        data = results["data"]
+
         # location is lon, lat, depth and type
         # e.g. {'coordinates': [-123.711083, 38.914556, 0.0], 'type': 'Point'}
-        lon, lat, depth = nested_lookup("location", results)[0]["coordinates"]
-        keys = ["minLongitude", "minLatitude", "maxLongitude", "maxLatitude"]
-        metadata.update(dict(zip(keys, [lon, lat, lon, lat])))
+        lon, lat, depth = data["location"]["coordinates"]
+        metadata.update(
+            {
+                "minLongitude": lon,
+                "minLatitude": lat,
+                "maxLongitude": lon,
+                "maxLatitude": lat,
+            }
+        )
 
-        # e.g. 106793
+        # e.g. 106793. Keep the nested_lookup here: docs results can carry an
+        # "id" at the top level too, which takes precedence.
         metadata["internal_id"] = int(
             [value for value in nested_lookup("id", results) if value is not None][0]
         )
 
-        metadata["variables_details"] = nested_lookup("figures", results)[0]
-        metadata["variables"] = list(set(nested_lookup("datasetVariableId", results)))
-
-        metadata["datumConversions"] = nested_lookup("datumConversions", results)[0]
-
-        filter = f"%7B%22stations%22:%5B%22{metadata['internal_id']}%22%5D%7D"
-        baseurl = "https://sensors.axds.co/api"
-        metadata_url = f"{baseurl}/metadata/filter/custom?filter={filter}"
-        metadata["metadata_url"] = metadata_url
+        # flatten the figures tree into one entry per variable, hoisting the
+        # per-figure lookups out of the inner loops
+        figures = data["figures"]
+        variables_details = {}
+        for fig in figures:
+            fig_label = fig["label"]
+            pgid = fig["parameterGroupId"]
+            subPlots = chain.from_iterable(plot["subPlots"] for plot in fig["plots"])
+            for subPlot in subPlots:
+                variables_details[subPlot["datasetVariableId"]] = {
+                    "parameterGroupLabel": fig_label,
+                    "parameterGroupId": pgid,
+                    "datasetVariableId": subPlot["datasetVariableId"],
+                    "parameterId": subPlot["parameterId"],
+                    "label": subPlot["label"],
+                    "deviceId": subPlot["deviceId"],
+                }
+        metadata["variables_details"] = variables_details
+        metadata["variables"] = list(variables_details)
+
+        metadata["datumConversions"] = data["datumConversions"]
+
+        metadata["metadata_url"] = make_metadata_url(
+            make_filter(metadata["internal_id"])
+        )
 
         # 1 or 2?
-        metadata["version"] = nested_lookup("version", results)[0]
+        metadata["version"] = data["version"]
 
         # name on other sites, esp for ERDDAP
         metadata["foreignNames"] = list(
@@ -283,9 +416,13 @@ def make_label(label: str, units: Optional[str] = None, use_units: bool = True)
         return f"{label} [{units}]"
 
 
+@lru_cache(maxsize=256)
 def make_filter(internal_id: int, parameterGroupId: Optional[int] = None) -> str:
     """Make filter for Axiom Sensors API.
 
+    Cached since the same filter is rebuilt for the data, metadata, and
+    schema urls of one station.
+
     Parameters
     ----------
     internal_id : int
@@ -299,15 +436,22 @@ def make_filter(internal_id: int, parameterGroupId: Optional[int] = None) -> str
         filter to use in station metadata and data access
     """
 
-    filter = f"%7B%22stations%22%3A%5B%22{internal_id}%22%5D"
-
+    # build the filter as a dict and let the stdlib do the percent-encoding
+    # instead of hand-rolling the encoded JSON
+    payload: dict = {"stations": [str(internal_id)]}
     if parameterGroupId is not None:
-        filter += f"%2C%22parameterGroups%22%3A%5B{parameterGroupId}%5D"
+        payload["parameterGroups"] = [parameterGroupId]
+
+    return quote(json.dumps(payload, separators=(",", ":")))
 
-    # add ending }
-    filter += "%7D"
 
-    return filter
+@lru_cache(maxsize=128)
+def _format_date(time: str) -> str:
+    """Format a time the way the Sensor API expects.
+
+    Cached since the same start/end times are formatted once per filter.
+    """
+    return pd.Timestamp(time).strftime("%Y-%m-%dT%H:%M:%S")
 
 
 def make_data_url(
@@ -339,8 +483,8 @@ def make_data_url(
     """
 
     # handle start and end dates (maybe this should happen in cat?)
-    start_date = pd.Timestamp(start_time).strftime("%Y-%m-%dT%H:%M:%S")
-    end_date = pd.Timestamp(end_time).strftime("%Y-%m-%dT%H:%M:%S")
+    start_date = _format_date(start_time)
+    end_date = _format_date(end_time)
 
     if binned:
         return f"{baseurl}/observations/filter/custom/binned?filter={filter}&start={start_date}Z&end={end_date}Z&binInterval={bin_interval}"
@@ -391,17 +535,61 @@ def make_search_docs_url(
         raise KeyError("Correct key was not input for return")
 
 
-def response_from_url(url: str) -> Union[list, dict]:
+def response_from_url(url: str, use_cache: bool = False) -> Union[list, dict]:
     """Return response from url.
 
     Parameters
     ----------
     url : str
         URL to check.
+    use_cache : bool, optional
+        If True, cache the decoded response in-process keyed by url so that
+        repeat requests for the same url skip the network altogether.
 
     Returns
     -------
     list, dict
         should be a list or dict depending on the url
     """
-    return requests.get(url, headers=search_headers).json()
+    if use_cache:
+        return _cached_response_from_url(url)
+    response = session.get(url, timeout=(5, 60))
+    # fail fast on server errors instead of parsing an error body; retries
+    # with backoff have already run at the session level by this point
+    response.raise_for_status()
+    # orjson parses the raw bytes much faster than the stdlib json module,
+    # which matters for the large observations payloads
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+@lru_cache(maxsize=128)
+def _cached_response_from_url(url: str) -> Union[list, dict]:
+    """Cached version of ``response_from_url``."""
+    return response_from_url(url)
+
+
+def fetch_many(urls: list, max_workers: int = 16) -> list:
+    """Fetch responses for multiple urls concurrently.
+
+    The requests are independent network calls to the same servers, so they
+    are issued from a thread pool sharing the pooled session; responses are
+    returned in the order of ``urls``. A single url skips the pool.
+
+    Parameters
+    ----------
+    urls : list
+        URLs to fetch.
+    max_workers : int, optional
+        Upper bound on concurrent requests, by default 16.
+
+    Returns
+    -------
+    list
+        Decoded response per url, in input order.
+    """
+    if len(urls) == 1:
+        return [response_from_url(urls[0])]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        return list(executor.map(response_from_url, urls))
@@ -0,0 +1,15 @@
+import pytest
+
+from intake_axds import utils
+
+
+@pytest.fixture(autouse=True)
+def clear_utils_caches():
+    """Keep process-level caches from leaking mocked responses across tests."""
+    utils._context.cache_clear()
+    utils._context_names.cache_clear()
+    utils._cached_response_from_url.cache_clear()
+    yield
+    utils._context.cache_clear()
+    utils._context_names.cache_clear()
+    utils._cached_response_from_url.cache_clear()
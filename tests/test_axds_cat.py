@@ -5,16 +5,13 @@ import cf_pandas
 import intake
 import pytest
 
-from test_utils import FakeResponseParams
+from test_utils import FakeBaseResponse, FakeResponseParams
 
 from intake_axds.axds_cat import AXDSCatalog
 
 
 # call for sea_water_temperature
-class FakeResponse(object):
-    def __init__(self):
-        pass
-
+class FakeResponse(FakeBaseResponse):
     def json(self):
         res = {
             "results": [
@@ -162,10 +159,7 @@ class FakeResponse(object):
 
 
 # call for sea_water_practical_salinity
-class FakeResponseSalt(object):
-    def __init__(self):
-        pass
-
+class FakeResponseSalt(FakeBaseResponse):
     def json(self):
         res = {
             "results": [
@@ -250,7 +244,7 @@ def test_intake_opener():
     assert "open_axds_cat" in intake.__dir__()
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_platform_dataframe(mock_requests):
     """Test basic catalog API: platform as dataframe."""
 
@@ -261,7 +255,7 @@ def test_platform_dataframe(mock_requests):
     assert cat["test_platform_csv"].describe()["args"]["urlpath"] == "fake.csv.gz"
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_platform_search(mock_requests):
     """Test catalog with space/time search."""
 
@@ -281,7 +275,7 @@ def test_platform_search(mock_requests):
     assert cat["test_platform_parquet"].describe()["args"]["urlpath"] == "fake.parquet"
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_platform_search_for(mock_requests):
     """Test catalog with space/time search and search_for."""
 
@@ -311,7 +305,7 @@ def test_platform_search_for(mock_requests):
     assert cat.metadata["kwargs_search"] == cat2.metadata["kwargs_search"]
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_platform_search_variable_vocab(mock_requests):
     """Test catalog with variable search."""
 
@@ -345,7 +339,7 @@ def test_platform_search_variable_vocab(mock_requests):
     )
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_platform_search_variable_std_name(mock_requests):
     """Test catalog with variable search."""
 
@@ -374,7 +368,7 @@ def test_platform_search_variable_std_name(mock_requests):
     )
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_platform_search_variable_std_name_query_type_union(mock_requests):
     """Test catalog with variable search and query_types."""
 
@@ -399,7 +393,7 @@ def test_platform_search_variable_std_name_query_type_union(mock_requests):
     assert cat.get_search_urls() == search_urls
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_platform_search_variable_std_name_query_type_intersection(mock_requests):
     """Test catalog with variable search and query_types."""
 
@@ -472,7 +466,7 @@ def test_invalid_datatype():
         AXDSCatalog(datatype="invalid")
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_verbose(mock_requests, capfd):
     mock_requests.side_effect = [FakeResponse()]
 
@@ -482,20 +476,20 @@ def test_verbose(mock_requests, capfd):
     assert len(out) > 0
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_no_results(mock_requests):
     with pytest.raises(ValueError):
         AXDSCatalog(datatype="sensor_station")
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_not_a_standard_name(mock_requests):
     mock_requests.side_effect = [FakeResponseParams()]
     with pytest.raises(ValueError):
         AXDSCatalog(datatype="sensor_station", standard_names="not_a_standard_name")
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_sensor_search_variable_std_name_query_type_intersection_constrained(
     mock_requests,
 ):
@@ -1,15 +1,15 @@
 from unittest import mock
 
 import intake
+import pandas as pd
 import pytest
 
-from intake_axds.axds import AXDSSensorSource
+from test_utils import FakeBaseResponse
 
+from intake_axds.axds import AXDSSensorSource
 
-class FakeResponseSensorAPI123456(object):
-    def __init__(self):
-        pass
 
+class FakeResponseSensorAPI123456(FakeBaseResponse):
     def json(self):
         res = {
             "data": {
@@ -24,10 +24,7 @@ class FakeResponseSensorAPI123456(object):
         return res
 
 
-class FakeResponseSensorAPI111111(object):
-    def __init__(self):
-        pass
-
+class FakeResponseSensorAPI111111(FakeBaseResponse):
     def json(self):
         res = {
             "data": {
@@ -42,10 +39,7 @@ class FakeResponseSensorAPI111111(object):
         return res
 
 
-class FakeResponseSearchDocsV2(object):
-    def __init__(self):
-        pass
-
+class FakeResponseSearchDocsV2(FakeBaseResponse):
     def json(self):
         res = [
             {
@@ -85,10 +79,7 @@ class FakeResponseSearchDocsV2(object):
         return res
 
 
-class FakeResponseSearchDocsV1(object):
-    def __init__(self):
-        pass
-
+class FakeResponseSearchDocsV1(FakeBaseResponse):
     def json(self):
         res = [
             {
@@ -138,7 +129,7 @@ def test_binned():
     assert source.binned
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_ids(mock_requests):
     mock_requests.side_effect = [
         # FakeResponseSensorAPI123456(),
@@ -164,7 +155,7 @@ def test_times():
 
 
 # not using this approach now
-# @mock.patch("requests.get")
+# @mock.patch("requests.Session.get")
 # def test_filters(mock_requests):
 
 #     mock_requests.side_effect = [
@@ -182,7 +173,7 @@ def test_times():
 #     ]
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_data_urls_V2(mock_requests):
 
     mock_requests.side_effect = [
@@ -198,7 +189,214 @@ def test_data_urls_V2(mock_requests):
     assert source.data_urls == urls
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
+def test_partition_ranges(mock_requests):
+
+    mock_requests.side_effect = [
+        FakeResponseSearchDocsV2(),
+        FakeResponseSearchDocsV2(),
+    ]
+    source = AXDSSensorSource(internal_id=123456, chunk_freq="MS")
+    ranges = source.partition_ranges
+    assert len(ranges) == 2
+    assert ranges[0][0] == pd.Timestamp("2019-03-15T02:58:51.000Z")
+    assert ranges[0][1] == ranges[1][0] == pd.Timestamp("2019-04-01T02:58:51.000Z")
+    assert ranges[1][1] == pd.Timestamp("2019-04-08T07:54:56.000Z")
+
+    # a naive user start_time mixes with the tz-aware metadata end time
+    mock_requests.side_effect = [
+        FakeResponseSearchDocsV2(),
+        FakeResponseSearchDocsV2(),
+    ]
+    source = AXDSSensorSource(
+        internal_id=123456, chunk_freq="MS", start_time="2019-03-20"
+    )
+    ranges = source.partition_ranges
+    assert ranges[0][0] == pd.Timestamp("2019-03-20", tz="UTC")
+    assert ranges[-1][1] == pd.Timestamp("2019-04-08T07:54:56.000Z")
+
+    # without chunk_freq there is a single partition over the whole range
+    mock_requests.side_effect = [
+        FakeResponseSearchDocsV2(),
+        FakeResponseSearchDocsV2(),
+    ]
+    source = AXDSSensorSource(internal_id=123456)
+    assert len(source.partition_ranges) == 1
+
+
+class FakeResponseRawData(FakeBaseResponse):
+    """One raw data feed with a single variable; rows are [time, value]."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def json(self):
+        res = {
+            "data": {
+                "groupedFeeds": [
+                    {
+                        "metadata": {
+                            "lon": None,
+                            "lat": None,
+                            "z": None,
+                            "time": {"index": 0, "label": "time", "units": "UTC"},
+                            "values": [
+                                {
+                                    "index": 1,
+                                    "deviceId": "deviceId",
+                                    "units": "m",
+                                    "parameterGroupId": "parameterGroupId",
+                                }
+                            ],
+                        },
+                        "data": self.rows,
+                    }
+                ]
+            }
+        }
+        return res
+
+
+class FakeResponseSearchDocsV2TwoVars(FakeBaseResponse):
+    def json(self):
+        res = [
+            {
+                "id": "123456",
+                "uuid": "test_platform_parquet",
+                "label": "test_label",
+                "description": "Test description.",
+                "type": "platform2",
+                "start_date_time": "2019-03-15T02:58:51.000Z",
+                "end_date_time": "2019-04-08T07:54:56.000Z",
+                "data": {
+                    "location": {"coordinates": [-123.711083, 38.914556, 0.0]},
+                    "id": 106793,
+                    "figures": [
+                        {
+                            "label": "label",
+                            "parameterGroupId": "parameterGroupId",
+                            "plots": [
+                                {
+                                    "subPlots": [
+                                        {
+                                            "datasetVariableId": "var_surface",
+                                            "parameterId": "parameterId",
+                                            "label": "var_surface",
+                                            "deviceId": "dev1",
+                                        },
+                                        {
+                                            "datasetVariableId": "var_z",
+                                            "parameterId": "parameterId",
+                                            "label": "var_z",
+                                            "deviceId": "dev2",
+                                        },
+                                    ]
+                                }
+                            ],
+                        }
+                    ],
+                    "datumConversions": [],
+                    "version": 2,
+                },
+            }
+        ]
+        return res
+
+
+class FakeResponseRawDataMixedZ(FakeBaseResponse):
+    """Two feeds: one with a plain time index, one with a (time, z) index."""
+
+    def json(self):
+        res = {
+            "data": {
+                "groupedFeeds": [
+                    {
+                        "metadata": {
+                            "lon": None,
+                            "lat": None,
+                            "z": None,
+                            "time": {"index": 0, "label": "time", "units": "UTC"},
+                            "values": [
+                                {
+                                    "index": 1,
+                                    "deviceId": "dev1",
+                                    "units": "m",
+                                    "parameterGroupId": "parameterGroupId",
+                                }
+                            ],
+                        },
+                        "data": [
+                            ["2019-03-20T00:00:00.000Z", 1.0],
+                            ["2019-03-21T00:00:00.000Z", 2.0],
+                        ],
+                    },
+                    {
+                        "metadata": {
+                            "lon": None,
+                            "lat": None,
+                            "z": {"index": 1, "label": "z", "units": "m"},
+                            "time": {"index": 0, "label": "time", "units": "UTC"},
+                            "values": [
+                                {
+                                    "index": 2,
+                                    "deviceId": "dev2",
+                                    "units": "C",
+                                    "parameterGroupId": "parameterGroupId",
+                                }
+                            ],
+                        },
+                        "data": [
+                            ["2019-03-20T00:00:00.000Z", -5.0, 10.0],
+                            ["2019-03-21T00:00:00.000Z", -5.0, 11.0],
+                        ],
+                    },
+                ]
+            }
+        }
+        return res
+
+
+@mock.patch("requests.Session.get")
+def test_read_mixed_index_feeds(mock_requests):
+    """Feeds mixing a time index with a (time, z) MultiIndex still merge."""
+
+    mock_requests.side_effect = [
+        FakeResponseSearchDocsV2TwoVars(),
+        FakeResponseRawDataMixedZ(),
+    ]
+    source = AXDSSensorSource(internal_id=123456)
+    df = source.read()
+    assert df.index.nlevels == 2
+    assert sorted(df.columns) == ["var_surface [m]", "var_z [C]"]
+    # surface values align with the z feed rows on the shared time level
+    assert df["var_surface [m]"].notnull().all()
+    assert df["var_z [C]"].notnull().all()
+
+
+@mock.patch("requests.Session.get")
+def test_read_chunked(mock_requests):
+
+    # both windows return the sample falling exactly on the shared closed
+    # boundary; read() keeps only one copy
+    rows1 = [
+        ["2019-03-20T00:00:00.000Z", 1.0],
+        ["2019-03-25T00:00:00.000Z", 2.0],
+        ["2019-04-01T02:58:51.000Z", 3.0],
+    ]
+    rows2 = [["2019-04-01T02:58:51.000Z", 3.0], ["2019-04-05T00:00:00.000Z", 4.0]]
+    mock_requests.side_effect = [
+        FakeResponseSearchDocsV2(),
+        FakeResponseRawData(rows1),
+        FakeResponseRawData(rows2),
+    ]
+    source = AXDSSensorSource(internal_id=123456, chunk_freq="MS")
+    df = source.read()
+    assert df.shape == (4, 1)
+    assert df.index.is_monotonic_increasing
+    assert not df.index.duplicated().any()
+
+
+@mock.patch("requests.Session.get")
 def test_data_urls_V1(mock_requests):
 
     mock_requests.side_effect = [
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """Tests for generic and utility functions."""
+import json
+
 from unittest import mock
 
 from intake_axds import utils
@@ -11,10 +13,24 @@ def test_get_project_version():
     assert version is not None
 
 
-class FakeResponseParams(object):
+class FakeBaseResponse(object):
+    """Mimics enough of requests.Response for response_from_url.
+
+    Subclasses define json() and content is derived from it.
+    """
+
     def __init__(self):
         pass
 
+    @property
+    def content(self):
+        return json.dumps(self.json()).encode()
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeResponseParams(FakeBaseResponse):
     def json(self):
         params = {
             "parameters": [
@@ -91,7 +107,7 @@ class FakeResponseParams(object):
         return params
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_parameters(mock_requests):
     """Basic tests of return_parameter_options."""
 
@@ -103,7 +119,7 @@ def test_parameters(mock_requests):
     assert {"parameters", "parameterGroups"} >= output.keys()
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_parameters_and_key(mock_requests):
     """match a key"""
 
@@ -120,7 +136,7 @@ def test_parameters_and_key(mock_requests):
     assert pgids == (186,)
 
 
-@mock.patch("requests.get")
+@mock.patch("requests.Session.get")
 def test_parameters_and_std_names(mock_requests):
     """match std_names"""
 
@@ -211,27 +227,19 @@ def test_load_metadata():
         "maxLongitude": -123.711083,
         "maxLatitude": 38.914556,
         "internal_id": 106793,
-        "variables_details": [
-            {
-                "label": "label",
+        "variables_details": {
+            "datasetVariableId": {
+                "parameterGroupLabel": "label",
                 "parameterGroupId": "parameterGroupId",
-                "plots": [
-                    {
-                        "subPlots": [
-                            {
-                                "datasetVariableId": "datasetVariableId",
-                                "parameterId": "parameterId",
-                                "label": "label",
-                                "deviceId": "deviceId",
-                            }
-                        ]
-                    }
-                ],
+                "datasetVariableId": "datasetVariableId",
+                "parameterId": "parameterId",
+                "label": "label",
+                "deviceId": "deviceId",
             }
-        ],
+        },
         "variables": ["datasetVariableId"],
         "datumConversions": [],
-        "metadata_url": "https://sensors.axds.co/api/metadata/filter/custom?filter=%7B%22stations%22:%5B%22106793%22%5D%7D",
+        "metadata_url": "https://sensors.axds.co/api/metadata/filter/custom?filter=%7B%22stations%22%3A%5B%22106793%22%5D%7D",
         "version": 2,
         "foreignNames": [],
     }